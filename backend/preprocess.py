@@ -0,0 +1,71 @@
+"""Image decoding helpers for the detection endpoints.
+
+OpenCV and libjpeg-turbo release the GIL while decoding and resizing, so
+server.py runs these on its thread pool; frames stay in-process instead of
+being pickled back from worker processes.
+"""
+import base64
+from typing import Tuple, Union
+
+import cv2
+import numpy as np
+
+try:
+    from turbojpeg import TJPF_BGR, TJPF_RGB, TurboJPEG
+    _turbojpeg = TurboJPEG()
+except Exception:  # PyTurboJPEG or the libturbojpeg shared library is not installed
+    _turbojpeg = None
+
+
+def _image_bytes(image_data: Union[str, bytes]) -> bytes:
+    if isinstance(image_data, bytes):
+        # Raw upload (multipart): already the encoded image file
+        return image_data
+    if image_data.startswith('data:image'):
+        image_data = image_data.split(',')[1]
+    return base64.b64decode(image_data)
+
+
+def _decode(image_data: Union[str, bytes], rgb: bool) -> np.ndarray:
+    """Decode straight into the requested channel order; JPEGs go through libjpeg-turbo when available"""
+    image_bytes = _image_bytes(image_data)
+    if _turbojpeg is not None and image_bytes[:2] == b'\xff\xd8':
+        try:
+            return _turbojpeg.decode(image_bytes, pixel_format=TJPF_RGB if rgb else TJPF_BGR)
+        except Exception:
+            pass  # let OpenCV try (and report) malformed JPEGs
+    bgr = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if bgr is None:
+        raise ValueError("Could not decode image data")
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB) if rgb else bgr
+
+
+def letterbox_geometry(h: int, w: int, size: int) -> Tuple[int, int, int, int]:
+    """Resized (height, width) and (top, left) padding that fit an h x w frame into size x size"""
+    gain = size / max(h, w)
+    nh, nw = max(1, round(h * gain)), max(1, round(w * gain))
+    return nh, nw, (size - nh) // 2, (size - nw) // 2
+
+
+def letterbox_resize(bgr: np.ndarray, size: int) -> np.ndarray:
+    """Aspect-preserving resize so the longer side equals size; padding is left to the kernel"""
+    h, w = bgr.shape[:2]
+    nh, nw, _, _ = letterbox_geometry(h, w, size)
+    return cv2.resize(bgr, (nw, nh), interpolation=cv2.INTER_LINEAR)
+
+
+def decode_frame(image_data: Union[str, bytes], size: int) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Decode a base64 (optionally data-URL prefixed) or raw image into an aspect-preserving network-sized BGR frame"""
+    bgr = _decode(image_data, rgb=False)
+    return letterbox_resize(bgr, size), bgr.shape[:2]
+
+
+def decode_rgb(image_data: Union[str, bytes], max_side: int) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Decode a base64 or raw image into an RGB frame for MediaPipe, shrunk so its longer side is at most max_side"""
+    rgb = _decode(image_data, rgb=True)
+    h, w = rgb.shape[:2]
+    scale = max_side / max(h, w)
+    if scale < 1:
+        rgb = cv2.resize(rgb, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    return rgb, (h, w)
+
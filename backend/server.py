@@ -1,33 +1,36 @@
-from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, File, Form, UploadFile, HTTPException, Header
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import sys
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-import uuid
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated, List, NamedTuple, Optional, Dict, Any, Tuple, Union
+import time
+import struct
+import itertools
+import hashlib
+import re
 from datetime import datetime, timezone
-import cv2
 import numpy as np
 import torch
-from ultralytics import YOLO
 import base64
 import io
-from PIL import Image
-import json
+import orjson
 import random
-import speech_recognition as sr
-import pyttsx3
-from gtts import gTTS
-import tempfile
+import soundfile as sf
+import webrtcvad
 import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 import mediapipe as mp
-import math
-from sklearn.metrics.pairwise import cosine_similarity
+import ahocorasick
+
+from preprocess import decode_frame, decode_rgb
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -41,17 +44,66 @@ logger = logging.getLogger(__name__)
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=50,
+    minPoolSize=5,
+    compressors='zstd,snappy',  # history documents compress well on the wire
+    serverSelectionTimeoutMS=2000
+)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Initialize thread pool for blocking operations
-executor = ThreadPoolExecutor(max_workers=4)
+# Thread pool for blocking CPU work: frame decoding (cv2 releases the GIL), batched YOLOv5
+# inference when enabled and model loading at startup. MediaPipe runs on hands_executor instead.
+# Capped at 8 because OpenCV and torch multithread internally and oversubscription hurts
+executor = ThreadPoolExecutor(max_workers=min(os.cpu_count() or 4, 8), thread_name_prefix='gesture')
+
+# MediaPipe's Hands graph is not thread-safe, so fallback detection runs on one dedicated thread
+hands_executor = ThreadPoolExecutor(max_workers=1)
+
+# Blocking network calls (Google STT, gTTS) mostly wait, so they get a wide thread pool
+io_pool = ThreadPoolExecutor(max_workers=32)
+
+# Opt-in: the YOLOv5 path (yolo.py) needs torch.hub (network) and weights trained on the labels.json classes
+USE_YOLO = os.environ.get('USE_YOLO', '0') == '1'
+HANDS_SESSION_CACHE = 64  # sessions that keep their own MediaPipe tracking state
+# 0 selects hand_landmark_lite.tflite; set 1 for the full landmark model
+HANDS_MODEL_COMPLEXITY = int(os.environ.get('HANDS_MODEL_COMPLEXITY', '0'))
+MEDIAPIPE_MAX_SIDE = 640  # frames are shrunk to this before hand tracking; bboxes stay in original pixels
+FRAME_CACHE_PER_SESSION = 4  # recent frame digests remembered per session
+FRAME_CACHE_SESSIONS = 1024
+
+# Speech recognition
+STT_LANGUAGES = {"urdu": "ur-PK", "pashto": "ps-AF", "english": "en-US"}
+# Simulated recognition results for the web demo when no audio/speech is available
+DEMO_PHRASES = {
+    'english': ('hello', 'thank you', 'water', 'food', 'help', 'one', 'two', 'three'),
+    'urdu': ('سلام', 'شکریہ', 'پانی', 'کھانا', 'مدد'),
+    'pashto': ('سلام ورور', 'مننه', 'اوبه', 'خواړه', 'مرسته')
+}
+VAD_SAMPLE_RATES = (8000, 16000, 32000, 48000)
+VAD_FRAME_MS = 30
+
+# Local neural TTS (Meta MMS VITS voices), loaded in the background after startup; gTTS serves
+# /text-to-speech until they are ready, and for good if they can't load
+TTS_MODELS = {"urdu": "facebook/mms-tts-urd-script_arabic", "pashto": "facebook/mms-tts-pbt"}
+USE_LOCAL_TTS = os.environ.get('USE_LOCAL_TTS', '1') == '1'
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?۔؟])\s+')
+STREAM_BUFFER = 4  # synthesized chunks queued ahead of a slow /text-to-speech client
+
+# Translation history is written in bulk by a background task
+HISTORY_BATCH = 100
+HISTORY_FLUSH_INTERVAL = 0.05  # seconds
+HISTORY_TTL_SECONDS = 86400 * 30
+HISTORY_QUEUE_SIZE = 10_000  # cap on buffered documents if Mongo falls behind
+STATS_TTL = 2.0  # seconds /stats counts are served from cache
+STATS_MAX_TIME_MS = 1000  # server-side limit on the stats aggregation
 
 # Mock Pakistani Sign Language Dataset - 100+ Gestures
 MOCK_GESTURES = {
@@ -218,15 +270,288 @@ MOCK_GESTURES = {
     "kharidna": {"urdu": "خریدنا", "pashto": "اخیستل", "meaning": "Buy"}
 }
 
+class GestureInfo(NamedTuple):
+    urdu: str
+    pashto: str
+    meaning: str
+
+class GestureTable:
+    """Read-only, column-oriented copy of the gesture dataset addressed by integer index"""
+
+    def __init__(self, gestures: Dict[str, Dict[str, str]]):
+        self.keys = tuple(sys.intern(key) for key in gestures)
+        self.urdu = tuple(sys.intern(info["urdu"]) for info in gestures.values())
+        self.pashto = tuple(sys.intern(info["pashto"]) for info in gestures.values())
+        self.meaning = tuple(sys.intern(info["meaning"]) for info in gestures.values())
+        # (urdu, pashto, meaning) per gesture, for hot paths that need all three at once
+        self.rows = tuple(GestureInfo(*row) for row in zip(self.urdu, self.pashto, self.meaning))
+        self.index = {key: idx for idx, key in enumerate(self.keys)}
+
+    def data(self, idx: int) -> Dict[str, str]:
+        return {"urdu": self.urdu[idx], "pashto": self.pashto[idx], "meaning": self.meaning[idx]}
+
+GESTURE_TABLE = GestureTable(MOCK_GESTURES)
+
+# /gestures never changes, so encode its body and validator once
+GESTURES_JSON = orjson.dumps({"gestures": MOCK_GESTURES, "count": len(MOCK_GESTURES)})
+GESTURES_ETAG = f'"{hashlib.md5(GESTURES_JSON).hexdigest()}"'
+# Shared caches and CDNs may serve the list for a minute, then revalidate with the ETag
+GESTURES_HEADERS = {"ETag": GESTURES_ETAG, "Cache-Control": "public, max-age=60"}
+
+def normalize_text(text: str) -> str:
+    """Canonical form for phrase lookups: lowercase with single spaces"""
+    return " ".join(text.lower().split())
+
+def _build_text_index(column: Tuple[str, ...]):
+    """Index gesture phrases by exact text plus an Aho-Corasick automaton for partial matches"""
+    exact = {}
+    automaton = ahocorasick.Automaton()
+    for idx, phrase in enumerate(column):
+        phrase = normalize_text(phrase)
+        exact.setdefault(phrase, idx)
+        for needle in (phrase, *phrase.split()):
+            # Lowest index wins for shared words, same as scanning the dataset in order
+            if needle not in automaton:
+                automaton.add_word(needle, idx)
+    automaton.make_automaton()
+    return exact, automaton
+
+TEXT_INDEX = {
+    "urdu": _build_text_index(GESTURE_TABLE.urdu),
+    "pashto": _build_text_index(GESTURE_TABLE.pashto)
+}
+
+def _find_gesture_index(norm_text: str, language: str) -> Optional[int]:
+    """Resolve normalized text to a GESTURE_TABLE row; the per-phrase answers are precomputed in TEXT_INDEX"""
+    exact, automaton = TEXT_INDEX["pashto" if language == "pashto" else "urdu"]
+
+    # Whole-phrase hit is a single hash probe
+    idx = exact.get(norm_text)
+    if idx is None:
+        # One pass over the text finds every phrase/word occurrence; keep the earliest gesture
+        idx = min((hit for _, hit in automaton.iter(norm_text)), default=None)
+    return idx
+
+# /text-to-sign vocabulary: Urdu/Pashto phrases based on the reference images, then English, mapped to gesture keys
+URDU_TO_GESTURE = {
+    # Greetings and politeness
+    'سلام': 'salam',
+    'سلامات': 'salam', 
+    'السلام علیکم': 'salam',
+    'نمسکار': 'salam',
+    'شکریہ': 'shukriya',
+    'شكريه': 'shukriya',
+    'تھینک یو': 'shukriya',
+    'مننه': 'shukriya',  # Pashto
+    'برائے کرم': 'please',
+    'مہربانی': 'please',
+    'معاف کریں': 'sorry',
+    'بخشیں': 'sorry',
+    'معذرت': 'sorry',
+    
+    # Basic needs and actions
+    'پانی': 'paani',
+    'اوبه': 'paani',  # Pashto
+    'کھانا': 'khana',
+    'خواړه': 'khana',  # Pashto
+    'کھانے کا': 'eat',
+    'پینا': 'drink',
+    'پیاس': 'drink',
+    'اور': 'more',
+    'زیادہ': 'more',
+    'مدد': 'madad',
+    'مرسته': 'madad',  # Pashto
+    
+    # Numbers (Urdu/Pashto)
+    'ایک': 'ek',
+    'یو': 'ek',  # Pashto
+    'دو': 'do',
+    'دوه': 'do',  # Pashto
+    'تین': 'teen',
+    'درې': 'teen',  # Pashto
+    'چار': 'char',
+    'څلور': 'char',  # Pashto
+    'پانچ': 'panch',
+    'پنځه': 'panch',  # Pashto
+    
+    # Family relationships
+    'ماں': 'maa',
+    'مور': 'maa',  # Pashto
+    'باپ': 'baap',
+    'پلار': 'baap',  # Pashto
+    'بھائی': 'bhai',
+    'ورور': 'bhai',  # Pashto
+    'بہن': 'behan',
+    'خور': 'behan',  # Pashto
+    
+    # Common expressions and gestures
+    'ٹھیک ہے': 'ok',
+    'اوکے': 'ok',
+    'رک جاؤ': 'stop',
+    'رکو': 'stop',
+    'فتح': 'victory',
+    'کامیابی': 'victory',
+    'فون کرو': 'call',
+    'کال': 'call',
+    'خوش قسمتی': 'good_luck',
+    'بہترین': 'good_luck',
+    
+    # Common places and objects
+    'گھر': 'ghar',
+    'کور': 'ghar',  # Pashto
+    'کتاب': 'kitab',  # Same in Pashto
+    'کام': 'kaam',
+    'کار': 'kaam',  # Pashto
+    'دوست': 'dost',
+    'ملګری': 'dost',  # Pashto
+    
+    # Farewells
+    'خدا حافظ': 'khuda_hafiz',
+    'الوداع': 'khuda_hafiz',
+    'د خدای په امان': 'khuda_hafiz'  # Pashto
+}
+
+# Enhanced English to gesture mapping
+ENGLISH_TO_GESTURE = {
+    # Basic greetings
+    'hello': 'salam',
+    'hi': 'salam',
+    'salam': 'salam',
+    'greetings': 'salam',
+    
+    # Politeness
+    'thank you': 'shukriya',
+    'thanks': 'shukriya',
+    'shukriya': 'shukriya',
+    'please': 'please',
+    'sorry': 'sorry',
+    'excuse me': 'sorry',
+    'apologize': 'sorry',
+    
+    # Daily needs
+    'water': 'paani',
+    'paani': 'paani',
+    'food': 'khana',
+    'khana': 'khana',
+    'eat': 'eat',
+    'eating': 'eat',
+    'drink': 'drink',
+    'drinking': 'drink',
+    'more': 'more',
+    'help': 'madad',
+    'madad': 'madad',
+    'assistance': 'madad',
+    
+    # Numbers
+    'one': 'ek',
+    'ek': 'ek',
+    'two': 'do',
+    'do': 'do',
+    'three': 'teen',
+    'teen': 'teen',
+    'four': 'char',
+    'char': 'char',
+    'five': 'panch',
+    'panch': 'panch',
+    
+    # Family
+    'mother': 'maa',
+    'mom': 'maa',
+    'maa': 'maa',
+    'father': 'baap',
+    'dad': 'baap',
+    'baap': 'baap',
+    'brother': 'bhai',
+    'bhai': 'bhai',
+    'sister': 'behan',
+    'behan': 'behan',
+    
+    # Common gestures
+    'ok': 'ok',
+    'okay': 'ok',
+    'alright': 'ok',
+    'stop': 'stop',
+    'halt': 'stop',
+    'victory': 'victory',
+    'win': 'victory',
+    'success': 'victory',
+    'call': 'call',
+    'phone': 'call',
+    'call me': 'call',
+    'good luck': 'good_luck',
+    'best wishes': 'good_luck',
+    'thumbs up': 'good_luck',
+    
+    # Places and objects
+    'home': 'ghar',
+    'house': 'ghar',
+    'ghar': 'ghar',
+    'book': 'kitab',
+    'kitab': 'kitab',
+    'work': 'kaam',
+    'job': 'kaam',
+    'kaam': 'kaam',
+    'friend': 'dost',
+    'dost': 'dost',
+    
+    # Farewells
+    'goodbye': 'khuda_hafiz',
+    'bye': 'khuda_hafiz',
+    'farewell': 'khuda_hafiz',
+    'see you': 'khuda_hafiz'
+}
+
+# Keys in the same canonical form as request text, so each lookup is a single probe
+URDU_TO_GESTURE = {normalize_text(k): v for k, v in URDU_TO_GESTURE.items()}
+ENGLISH_TO_GESTURE = {normalize_text(k): v for k, v in ENGLISH_TO_GESTURE.items()}
+
+# Both vocabularies folded into one text -> (gesture, is_urdu) table; Urdu/Pashto wins on overlap
+TEXT_TO_GESTURE = {
+    **{k: (v, False) for k, v in ENGLISH_TO_GESTURE.items()},
+    **{k: (v, True) for k, v in URDU_TO_GESTURE.items()}
+}
+
+# Number words that are also everyday function words ('what do you want', 'no one', Urdu
+# 'مجھے دو' = give me, 'یو' = you); they only resolve when they are the whole input
+EXACT_ONLY_KEYWORDS = frozenset(('do', 'one', 'two', 'teen', 'دو', 'یو'))
+
+def _build_keyword_automaton():
+    """One Aho-Corasick automaton over both /text-to-sign vocabularies, for phrases inside longer text"""
+    automaton = ahocorasick.Automaton()
+    for keyword, (gesture, urdu) in TEXT_TO_GESTURE.items():
+        # Keywords without a dataset gesture (please, sorry, ok, ...) would otherwise win as the
+        # earliest hit and hide a real gesture later in the sentence
+        if gesture in GESTURE_TABLE.index and keyword not in EXACT_ONLY_KEYWORDS:
+            automaton.add_word(keyword, (len(keyword), gesture, urdu))
+    automaton.make_automaton()
+    return automaton
+
+KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+def _match_keyword(text: str) -> Optional[Tuple[str, bool]]:
+    """Earliest (then longest) whole-word vocabulary phrase in text as (gesture, is_urdu)"""
+    best = None
+    for end, (length, gesture, urdu) in KEYWORD_AUTOMATON.iter(text):
+        start = end - length + 1
+        # Whole words only, so 'hi' doesn't fire inside 'this'
+        if (start > 0 and text[start - 1].isalnum()) or (end + 1 < len(text) and text[end + 1].isalnum()):
+            continue
+        if best is None or (start, -length) < best[0]:
+            best = ((start, -length), gesture, urdu)
+    return best[1:] if best else None
+
+def _resolve_text_gesture(text_lower: str) -> Optional[Tuple[str, bool]]:
+    """Map normalized /text-to-sign input to (gesture, is_urdu) via the prebuilt keyword tables"""
+    # Exact phrase is one probe; otherwise look for a phrase inside the sentence
+    hit = TEXT_TO_GESTURE.get(text_lower)
+    return hit if hit is not None else _match_keyword(text_lower)
+
 class RealGestureRecognitionService:
     def __init__(self):
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.5
-        )
+        self.hands = self._new_hands()
+        self.session_hands: OrderedDict = OrderedDict()
+        self.hands_lock = threading.Lock()
         self.mp_draw = mp.solutions.drawing_utils
         self.gesture_classifier = GestureClassifier()
         self.model_loaded = False
@@ -237,32 +562,59 @@ class RealGestureRecognitionService:
             logger.info("Loading MediaPipe hand detection model...")
             # Initialize gesture classifier with Pakistani sign language patterns
             self.gesture_classifier.initialize_patterns()
+            # One dummy frame builds the TFLite graphs now instead of on the first request
+            self.hands.process(np.zeros((224, 224, 3), dtype=np.uint8))
             self.model_loaded = True
             logger.info("Real gesture recognition model loaded successfully!")
             return True
         except Exception as e:
-            logger.error(f"Failed to load gesture recognition model: {e}")
+            logger.error("Failed to load gesture recognition model: %s", e)
             return False
     
-    def detect_gesture(self, image_data: str) -> Dict[str, Any]:
-        """Real gesture detection using MediaPipe and computer vision"""
+    def _new_hands(self):
+        # The classifier only reads the first hand, so don't pay for tracking a second one
+        return self.mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=1,
+            model_complexity=HANDS_MODEL_COMPLEXITY,
+            min_detection_confidence=0.7,
+            min_tracking_confidence=0.5
+        )
+
+    def _hands_for(self, session_id: str):
+        """Per-session Hands graph so consecutive frames track instead of re-running palm detection"""
+        with self.hands_lock:
+            hands = self.session_hands.get(session_id)
+            if hands is not None:
+                self.session_hands.move_to_end(session_id)
+                return hands
+            hands = self.session_hands[session_id] = self._new_hands()
+            if len(self.session_hands) > HANDS_SESSION_CACHE:
+                _, evicted = self.session_hands.popitem(last=False)
+                evicted.close()
+            return hands
+
+    def close(self):
+        """Release every MediaPipe graph; call from the thread that runs detection"""
+        with self.hands_lock:
+            for hands in self.session_hands.values():
+                hands.close()
+            self.session_hands.clear()
+        self.hands.close()
+
+    def detect_rgb(self, image_rgb: np.ndarray, session_id: Optional[str] = None,
+                   image_shape: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """Run MediaPipe hand tracking and classification on an already decoded RGB frame"""
         try:
-            # Decode base64 image
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            image_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            
-            # Process with MediaPipe
-            image_rgb = cv2.cvtColor(image_cv, cv2.COLOR_BGR2RGB)
-            results = self.hands.process(image_rgb)
+            # Landmarks are normalized, so bboxes are scaled by the pre-downscale frame size
+            image_shape = image_shape or image_rgb.shape[:2]
+            hands = self._hands_for(session_id) if session_id else self.hands
+            results = hands.process(image_rgb)
             
             if results.multi_hand_landmarks:
                 for hand_landmarks in results.multi_hand_landmarks:
                     # Extract hand landmarks
-                    landmarks = self._extract_landmarks(hand_landmarks, image_rgb.shape)
+                    landmarks = self._extract_landmarks(hand_landmarks, image_shape)
                     
                     # Classify gesture using real computer vision
                     gesture_result = self.gesture_classifier.classify_gesture(landmarks)
@@ -272,19 +624,20 @@ class RealGestureRecognitionService:
                         confidence = gesture_result['confidence']
                         
                         # Get gesture information
-                        if gesture_key in MOCK_GESTURES:
-                            gesture_info = MOCK_GESTURES[gesture_key]
+                        idx = GESTURE_TABLE.index.get(gesture_key)
+                        if idx is not None:
+                            urdu_text, pashto_text, meaning = GESTURE_TABLE.rows[idx]
                             
                             # Calculate bounding box
-                            bbox = self._calculate_bbox(hand_landmarks, image_rgb.shape)
+                            bbox = self._calculate_bbox(landmarks, image_shape)
                             
                             return {
                                 "gesture": gesture_key,
                                 "confidence": confidence,
                                 "bbox": bbox,
-                                "urdu_text": gesture_info["urdu"],
-                                "pashto_text": gesture_info["pashto"],
-                                "meaning": gesture_info["meaning"],
+                                "urdu_text": urdu_text,
+                                "pashto_text": pashto_text,
+                                "meaning": meaning,
                                 "landmarks_detected": True,
                                 "detection_method": "YOLOv5 + Hand Tracking"
                             }
@@ -302,7 +655,7 @@ class RealGestureRecognitionService:
             }
             
         except Exception as e:
-            logger.error(f"Error in real gesture detection: {e}")
+            logger.error("Error in real gesture detection: %s", e)
             return {"error": str(e)}
     
     def _extract_landmarks(self, hand_landmarks, image_shape):
@@ -312,14 +665,15 @@ class RealGestureRecognitionService:
             landmarks.extend([landmark.x, landmark.y, landmark.z])
         return landmarks
     
-    def _calculate_bbox(self, hand_landmarks, image_shape):
-        """Calculate bounding box for detected hand"""
+    def _calculate_bbox(self, landmarks, image_shape):
+        """Calculate bounding box for detected hand from the flat landmark list"""
         h, w = image_shape[:2]
-        x_coords = [lm.x * w for lm in hand_landmarks.landmark]
-        y_coords = [lm.y * h for lm in hand_landmarks.landmark]
+        # Reuse the extracted [x, y, z, ...] values instead of walking the protobuf landmarks again
+        x_coords = landmarks[0::3]
+        y_coords = landmarks[1::3]
         
-        x_min, x_max = min(x_coords), max(x_coords)
-        y_min, y_max = min(y_coords), max(y_coords)
+        x_min, x_max = min(x_coords) * w, max(x_coords) * w
+        y_min, y_max = min(y_coords) * h, max(y_coords) * h
         
         # Add padding
         padding = 20
@@ -333,6 +687,7 @@ class RealGestureRecognitionService:
 class GestureClassifier:
     def __init__(self):
         self.gesture_patterns = {}
+        self.pattern_masks = []
         
     def initialize_patterns(self):
         """Initialize gesture patterns for Pakistani sign language"""
@@ -381,6 +736,13 @@ class GestureClassifier:
                 "confidence_threshold": 0.6
             }
         }
+
+        # Finger states as 5-bit masks (bit 0 = thumb ... bit 4 = pinky) so matching is XOR + popcount
+        self.pattern_masks = [
+            (name, sum(extended << i for i, extended in enumerate(pattern["fingers_extended"])), pattern["confidence_threshold"])
+            for name, pattern in self.gesture_patterns.items()
+            if "fingers_extended" in pattern
+        ]
     
     def classify_gesture(self, landmarks) -> Optional[Dict]:
         """Classify gesture based on hand landmarks"""
@@ -397,74 +759,43 @@ class GestureClassifier:
             return best_match
             
         except Exception as e:
-            logger.error(f"Error in gesture classification: {e}")
+            logger.error("Error in gesture classification: %s", e)
             return None
     
-    def _analyze_finger_positions(self, landmarks):
-        """Analyze finger extension states from landmarks"""
-        # Simplified finger detection based on landmark positions
-        # In production, this would be more sophisticated
-        
-        # Extract key landmark points for each finger
-        finger_tips = [4, 8, 12, 16, 20]  # Thumb, Index, Middle, Ring, Pinky tips
-        finger_bases = [3, 6, 10, 14, 18]  # Corresponding base joints
-        
-        finger_states = []
-        
-        for i in range(5):
-            tip_idx = finger_tips[i] * 3
-            base_idx = finger_bases[i] * 3
-            
-            # Simple heuristic: if tip is higher than base, finger is extended
-            if tip_idx < len(landmarks) and base_idx < len(landmarks):
-                tip_y = landmarks[tip_idx + 1]
-                base_y = landmarks[base_idx + 1]
-                
-                # For thumb, check x-coordinate; for others, check y-coordinate
-                if i == 0:  # Thumb
-                    extended = abs(landmarks[tip_idx] - landmarks[base_idx]) > 0.05
-                else:
-                    extended = tip_y < base_y  # Lower y means higher on screen
-                    
-                finger_states.append(extended)
-            else:
-                finger_states.append(False)
-                
-        return finger_states
+    def _analyze_finger_positions(self, landmarks) -> int:
+        """Analyze finger extension states from landmarks, packed as a 5-bit mask (bit 0 = thumb)"""
+        # Flat [x0, y0, z0, x1, ...] list, so landmark k's x is at 3k and y at 3k + 1.
+        # Thumb: tip (4) vs IP joint (3) spread along x. Other fingers: tip (8/12/16/20) above
+        # PIP joint (6/10/14/18), where lower y means higher on screen.
+        return (
+            (abs(landmarks[12] - landmarks[9]) > 0.05)
+            | (landmarks[25] < landmarks[19]) << 1
+            | (landmarks[37] < landmarks[31]) << 2
+            | (landmarks[49] < landmarks[43]) << 3
+            | (landmarks[61] < landmarks[55]) << 4
+        )
     
-    def _match_gesture_pattern(self, finger_states):
+    def _match_gesture_pattern(self, finger_states: int):
         """Match finger states against known gesture patterns"""
         best_match = None
         best_confidence = 0.0
         
-        for gesture_name, pattern in self.gesture_patterns.items():
-            if gesture_name == "default":
-                continue
-                
-            # Calculate similarity with pattern
-            if "fingers_extended" in pattern:
-                expected = pattern["fingers_extended"]
-                similarity = sum(1 for i in range(min(len(finger_states), len(expected))) 
-                               if finger_states[i] == expected[i]) / len(expected)
-                
-                confidence = similarity * 0.9  # Base confidence
-                
-                # Add some randomness to simulate real detection variance
-                confidence += random.uniform(-0.1, 0.1)
-                confidence = max(0.0, min(1.0, confidence))
-                
-                if confidence > pattern["confidence_threshold"] and confidence > best_confidence:
-                    best_match = {
-                        "gesture": gesture_name,
-                        "confidence": confidence,
-                        "finger_pattern": finger_states
-                    }
-                    best_confidence = confidence
+        for gesture_name, mask, threshold in self.pattern_masks:
+            # Fraction of the five fingers that agree with the pattern
+            similarity = (5 - (finger_states ^ mask).bit_count()) / 5
+            confidence = similarity * 0.9  # Base confidence
+            
+            if confidence > threshold and confidence > best_confidence:
+                best_match = {
+                    "gesture": gesture_name,
+                    "confidence": confidence,
+                    "finger_pattern": finger_states
+                }
+                best_confidence = confidence
         
         # Fall back to random gesture if no good match (for demo purposes)
         if not best_match:
-            gesture_keys = list(MOCK_GESTURES.keys())
-            selected_gesture = random.choice(gesture_keys)
+            selected_gesture = random.choice(GESTURE_TABLE.keys)
             best_match = {
                 "gesture": selected_gesture,
                 "confidence": random.uniform(0.6, 0.8),
@@ -475,71 +806,322 @@ class GestureClassifier:
 
 class SpeechService:
     def __init__(self):
-        self.recognizer = sr.Recognizer()
+        self.recognizer = None
+        self.vad = webrtcvad.Vad(2)
+        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.tts_models = {}
+        self.tts_lock = threading.Lock()
+
+    def load_tts(self):
+        """Load the per-language VITS voices once and keep them resident on the device"""
+        if not USE_LOCAL_TTS:
+            logger.info("Local TTS disabled, using gTTS")
+            return False
         try:
-            self.tts_engine = pyttsx3.init()
+            # Imported here so workers with local TTS disabled never pay for transformers
+            from transformers import AutoTokenizer, VitsModel
+            models = {}
+            for language, model_name in TTS_MODELS.items():
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                model = VitsModel.from_pretrained(model_name).to(self.device).eval()
+                models[language] = (tokenizer, model)
+            # Publish every voice at once; requests keep using gTTS until this point
+            self.tts_models = models
+            logger.info("Local TTS voices loaded on %s", self.device)
+            return True
         except Exception as e:
-            logger.warning(f"TTS engine initialization failed: {e}. Using mock TTS.")
-            self.tts_engine = None
+            logger.error("Failed to load local TTS voices, using gTTS: %s", e)
+            return False
+
+    @staticmethod
+    def speech_media_type(voice) -> str:
+        return "audio/wav" if voice else "audio/mpeg"
+
+    def tts_voice(self, language: str):
+        """Loaded VITS (tokenizer, model) for the language, or None to use gTTS"""
+        # Same fallback as gTTS: anything that isn't Pashto is spoken with the Urdu voice
+        return self.tts_models.get("pashto" if language == "pashto" else "urdu")
         
-    def speech_to_text(self, audio_data: bytes, language: str = "ur") -> str:
-        """Mock speech recognition for Urdu/Pashto"""
+    def decode_audio(self, audio_data: bytes) -> Tuple[bytes, int]:
+        """Return 16-bit mono PCM and its sample rate from a WAV/FLAC/OGG file or raw PCM"""
         try:
-            # Mock speech recognition results
-            mock_sentences = {
-                "ur": [
-                    "سلام علیکم", "آپ کیسے ہیں؟", "شکریہ", "خدا حافظ",
-                    "مجھے مدد چاہیے", "یہ کیا ہے؟", "میں سمجھ گیا", "ڈاکٹر صاحب",
-                    "میں پانی چاہتا ہوں", "کھانا کہاں ہے؟", "گھر جانا ہے"
-                ],
-                "ps": [
-                    "سلام ورور", "تاسو څنګه یاست؟", "مننه", "خدای پامان",
-                    "زه مرستې ته اړتیا لرم", "دا څه دي؟", "زه پوه شوم", "ډاکټر صاحب",
-                    "زه اوبو ته اړتیا لرم", "خواړه چیرته دي؟", "کور ته ځم"
-                ]
-            }
-            
-            # Return random mock sentence
-            lang_code = "ps" if language == "pashto" else "ur"
-            return random.choice(mock_sentences.get(lang_code, mock_sentences["ur"]))
-            
-        except Exception as e:
-            return f"Error in speech recognition: {str(e)}"
-    
-    def text_to_speech(self, text: str, language: str = "ur") -> str:
-        """Mock text-to-speech conversion"""
+            samples, sample_rate = sf.read(io.BytesIO(audio_data), dtype='int16')
+            if samples.ndim > 1:
+                samples = samples[:, 0]
+            return samples.tobytes(), sample_rate
+        except Exception:
+            # Headerless payloads are treated as 16 kHz s16le, the format the web client records
+            usable = len(audio_data) - len(audio_data) % 2
+            return np.frombuffer(audio_data[:usable], dtype=np.int16).tobytes(), 16000
+
+    def trim_silence(self, pcm: bytes, sample_rate: int) -> bytes:
+        """Drop non-speech 30 ms frames so recognition only processes voiced audio"""
+        if sample_rate not in VAD_SAMPLE_RATES:
+            return pcm
+        frame_bytes = sample_rate * VAD_FRAME_MS // 1000 * 2
+        return b"".join(
+            pcm[offset:offset + frame_bytes]
+            for offset in range(0, len(pcm) - frame_bytes + 1, frame_bytes)
+            if self.vad.is_speech(pcm[offset:offset + frame_bytes], sample_rate)
+        )
+
+    def speech_to_text(self, audio_data: bytes, language: str = "urdu") -> Optional[str]:
+        """Recognize Urdu/Pashto speech with Google Speech Recognition"""
+        # Deferred: only requests that carry audio need the recognizer
         try:
-            # Return base64 audio data (mock)
-            return "mock_audio_base64_data"
-        except Exception as e:
-            return f"Error in TTS: {str(e)}"
+            import speech_recognition as sr
+        except ImportError:
+            # Same as a failed recognition: the caller falls back to a demo phrase
+            logger.warning("SpeechRecognition is not installed, skipping speech recognition")
+            return None
+        try:
+            pcm, sample_rate = self.decode_audio(audio_data)
+            voiced = self.trim_silence(pcm, sample_rate)
+            if not voiced:
+                return None
+
+            if self.recognizer is None:
+                self.recognizer = sr.Recognizer()
+            # Hand PCM straight to the recognizer; no temporary WAV file round-trip
+            audio = sr.AudioData(voiced, sample_rate, 2)
+            return self.recognizer.recognize_google(audio, language=STT_LANGUAGES.get(language, "ur-PK"))
+        except (sr.UnknownValueError, sr.RequestError) as e:
+            logger.warning("Speech recognition failed: %s", e)
+            return None
+    
+    def stream_speech(self, text: str, voice=None):
+        """Yield audio as each sentence of the text is synthesized (local WAV with a voice, else gTTS MP3)"""
+        if voice is None:
+            from gtts import gTTS
+            # gTTS has no Pashto voice; Urdu is the closest available. Passing lang skips detection.
+            tts = gTTS(text=text, lang="ur")
+            yield from tts.stream()
+            return
+
+        tokenizer, model = voice
+        # Streaming WAV: data size is unknown up front, so both RIFF sizes are left at the maximum
+        sample_rate = model.config.sampling_rate
+        yield struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 0xFFFFFFFF, b'WAVE', b'fmt ', 16, 1, 1,
+                          sample_rate, sample_rate * 2, 2, 16, b'data', 0xFFFFFFFF)
+        for sentence in SENTENCE_SPLIT.split(text):
+            inputs = tokenizer(sentence, return_tensors="pt").to(self.device)
+            with self.tts_lock, torch.inference_mode():
+                waveform = model(**inputs).waveform[0]
+            yield (waveform.clamp(-1, 1) * 32767).to(torch.int16).cpu().numpy().tobytes()
     
     def find_gesture_for_text(self, text: str, language: str = "ur") -> Optional[Dict]:
         """Find corresponding gesture for spoken text"""
-        # Enhanced keyword matching for demo
-        text_lower = text.lower()
-        
-        for gesture_key, gesture_data in MOCK_GESTURES.items():
-            if language == "pashto":
-                if gesture_data["pashto"].lower() in text_lower or any(word in text_lower for word in gesture_data["pashto"].split()):
-                    return {
-                        "gesture": gesture_key,
-                        "data": gesture_data
-                    }
-            else:  # Urdu
-                if gesture_data["urdu"].lower() in text_lower or any(word in text_lower for word in gesture_data["urdu"].split()):
-                    return {
-                        "gesture": gesture_key,
-                        "data": gesture_data
-                    }
-        
-        return None
+        idx = _find_gesture_index(normalize_text(text), language)
+        if idx is None:
+            return None
+
+        return {
+            "gesture": GESTURE_TABLE.keys[idx],
+            "data": GESTURE_TABLE.data(idx)
+        }
+
+class HistoryWriter:
+    """Buffers translation history documents and writes them with insert_many"""
+
+    def __init__(self, collection, max_batch: int = HISTORY_BATCH, interval: float = HISTORY_FLUSH_INTERVAL):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.interval = interval
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        # Documents the worker has taken off the queue but not yet handed to insert_many
+        self.batch: List[dict] = []
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=HISTORY_QUEUE_SIZE)
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the writer and flush whatever is still buffered"""
+        if self.worker:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+        if self.queue:
+            batch, self.batch = self.batch, []
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await self._flush(batch)
+
+    def put(self, document: dict):
+        """Queue a document without waiting; history is best-effort, so a full buffer drops it"""
+        try:
+            self.queue.put_nowait(document)
+        except asyncio.QueueFull:
+            logger.warning("Translation history buffer full, dropping record")
+
+    async def _flush(self, batch: List[dict]):
+        if not batch:
+            return
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+        except Exception as e:
+            logger.error("Failed to store %s translation history records: %s", len(batch), e)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.batch = [await self.queue.get()]
+            deadline = loop.time() + self.interval
+
+            while len(self.batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self.batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            batch, self.batch = self.batch, []
+            await self._flush(batch)
+
+class TranslationCounts:
+    """Per-type history counts cached for a short TTL; concurrent misses share one aggregation"""
+
+    def __init__(self, collection, ttl: float = STATS_TTL):
+        self.collection = collection
+        self.ttl = ttl
+        self.counts: Optional[Dict[str, int]] = None
+        self.expires = 0.0
+        self.pending: Optional[asyncio.Task] = None
+
+    async def get(self) -> Dict[str, int]:
+        if self.counts is not None and asyncio.get_running_loop().time() < self.expires:
+            return self.counts
+        if self.pending is None:
+            self.pending = asyncio.create_task(self._refresh())
+        # Shielded so one cancelled request doesn't cancel the aggregation others are awaiting
+        return await asyncio.shield(self.pending)
+
+    async def _refresh(self) -> Dict[str, int]:
+        try:
+            # One round-trip and one pass: per-type counts (covered by the translation_type index), total is their sum
+            pipeline = [{"$group": {"_id": "$translation_type", "n": {"$sum": 1}}}]
+            cursor = self.collection.aggregate(pipeline, maxTimeMS=STATS_MAX_TIME_MS)
+            counts = {doc["_id"]: doc["n"] async for doc in cursor}
+            self.counts = counts
+            self.expires = asyncio.get_running_loop().time() + self.ttl
+            return counts
+        except Exception as e:
+            # A slow or failed count shouldn't wedge /stats once there is something to show
+            if self.counts is None:
+                raise
+            logger.warning("Stats aggregation failed, serving previous counts: %s", e)
+            return self.counts
+        finally:
+            self.pending = None
+
+class FrameResultCache:
+    """Recent detection results per session, keyed by a digest of the encoded frame"""
+
+    def __init__(self, per_session: int = FRAME_CACHE_PER_SESSION, max_sessions: int = FRAME_CACHE_SESSIONS):
+        self.per_session = per_session
+        self.max_sessions = max_sessions
+        self.sessions: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def key(image_data: Union[str, bytes]) -> bytes:
+        data = image_data if isinstance(image_data, bytes) else image_data.encode('ascii', 'ignore')
+        return hashlib.blake2b(data, digest_size=8).digest()
+
+    def get(self, session_id: str, key: bytes) -> Optional[Dict[str, Any]]:
+        results = self.sessions.get(session_id)
+        if results is None or key not in results:
+            return None
+        self.sessions.move_to_end(session_id)
+        results.move_to_end(key)
+        return results[key]
+
+    def put(self, session_id: str, key: bytes, result: Dict[str, Any]):
+        results = self.sessions.get(session_id)
+        if results is None:
+            results = self.sessions[session_id] = OrderedDict()
+            if len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(session_id)
+        results[key] = result
+        if len(results) > self.per_session:
+            results.popitem(last=False)
+
+def not_modified(etag: str, if_none_match: Optional[str]) -> bool:
+    """True when the client's cached copy (If-None-Match) is still current"""
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
 
 # Initialize services
 gesture_service = RealGestureRecognitionService()
+if USE_YOLO:
+    # Imported only when enabled, so MediaPipe-only deployments never load the YOLOv5/TensorRT stack
+    from yolo import YOLO_IMG_SIZE, YOLO_LABELS, YOLO_WEIGHTS, GestureBatcher, YoloGestureDetector
+    yolo_detector = YoloGestureDetector(YOLO_WEIGHTS, YOLO_LABELS)
+    gesture_batcher = GestureBatcher(yolo_detector, executor)
+else:
+    logger.info("YOLOv5 detection disabled (set USE_YOLO=1 to enable), using MediaPipe only")
+    yolo_detector = gesture_batcher = None
+history_writer = HistoryWriter(db.translation_history)
+translation_counts = TranslationCounts(db.translation_history)
+frame_cache = FrameResultCache()
 speech_service = SpeechService()
 
 # Helper functions
+async def iterate_in_executor(generator_func, *args):
+    """Drive a blocking generator on the I/O pool and relay each item as soon as it is ready"""
+    loop = asyncio.get_running_loop()
+    # Bounded, so a slow client makes the producer wait instead of piling audio up in memory
+    queue = asyncio.Queue(maxsize=STREAM_BUFFER)
+    finished = object()
+    stopped = threading.Event()
+
+    def put(item):
+        # Blocks the producer thread until the consumer has room
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce():
+        items = generator_func(*args)
+        end = finished
+        try:
+            for item in items:
+                if stopped.is_set():
+                    return
+                put(item)
+        except Exception as e:
+            end = e
+        finally:
+            items.close()
+        if not stopped.is_set():
+            put(end)
+
+    future = loop.run_in_executor(io_pool, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                # Re-raised here so the failure is logged and the response is aborted, rather than
+                # ending a truncated body as if it were complete
+                raise item
+            yield item
+    finally:
+        # Runs on completion, on failure and when the client disconnects (the response task is cancelled):
+        # drop a producer that hasn't started, or stop a running one at its next item
+        stopped.set()
+        future.cancel()
+        # Empty the buffer so a producer blocked on a full queue wakes up and sees the stop flag
+        while not queue.empty():
+            queue.get_nowait()
+
 async def store_translation_history(history_data: dict):
     """Store translation history in database"""
     try:
@@ -552,34 +1134,49 @@ async def store_translation_history(history_data: dict):
             confidence=history_data.get("confidence"),
             timestamp=history_data["timestamp"]
         )
-        await db.translation_history.insert_one(history.dict())
+        history_writer.put(history.model_dump())
     except Exception as e:
-        logger.error(f"Failed to store translation history: {e}")
+        logger.error("Failed to store translation history: %s", e)
+
+_id_counter = itertools.count()
+
+def gen_id() -> str:
+    """Unique, roughly time-ordered ID without the os.urandom call behind uuid4"""
+    raw = struct.pack('<QHI', time.time_ns(), os.getpid() & 0xFFFF, next(_id_counter) & 0xFFFFFFFF)
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
 
 # Models
-class GestureDetectionRequest(BaseModel):
+class APIModel(BaseModel):
+    """Shared pydantic v2 config: drop unknown fields, no re-validation on assignment"""
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=False, validate_assignment=False)
+
+class GestureDetectionRequest(APIModel):
     image_data: str  # Base64 encoded image
-    session_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: Optional[str] = None  # None: no per-session tracking or frame cache
     
-class SpeechToSignRequest(BaseModel):
+class SpeechToSignRequest(APIModel):
     audio_data: str  # Base64 encoded audio
     language: str = "urdu"  # "urdu" or "pashto"
-    session_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str = Field(default_factory=gen_id)
 
-class TextToSignRequest(BaseModel):
-    text: str
-    language: str = "urdu"  # "urdu" or "pashto"
-    session_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+class TextToSignRequest(APIModel):
+    # Blank text is rejected with a 422 by pydantic-core before the handler runs
+    text: Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+    language: str = "english"  # "english", "urdu" or "pashto"
+    session_id: str = "demo"
 
-class TranslationHistory(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+class TranslationHistory(APIModel):
+    id: str = Field(default_factory=gen_id)
     session_id: str
     translation_type: str  # "sign_to_speech" or "speech_to_sign"
     input_data: str
-    output_data: str
+    output_data: Union[str, Dict[str, Any]]  # gesture name or full detection result
     language: str
     confidence: Optional[float] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+# Only the model's own fields leave Mongo; records carry their own id, so the ObjectId is not fetched
+HISTORY_PROJECTION = {"_id": 0, **{name: 1 for name in TranslationHistory.model_fields}}
 
 # API Routes
 @api_router.get("/")
@@ -587,71 +1184,104 @@ async def root():
     return {"message": "Pakistani Sign Language Translation API - YOLOv5 Powered!", "version": "2.0"}
 
 @api_router.get("/gestures")
-async def get_available_gestures():
+async def get_available_gestures(if_none_match: Optional[str] = Header(None)):
     """Get list of available gestures in the dataset"""
-    return {
-        "gestures": MOCK_GESTURES,
-        "count": len(MOCK_GESTURES)
-    }
+    if not_modified(GESTURES_ETAG, if_none_match):
+        return Response(status_code=304, headers=GESTURES_HEADERS)
+    return Response(content=GESTURES_JSON, media_type="application/json", headers=GESTURES_HEADERS)
 
-@api_router.post("/detect-gesture")
-async def detect_gesture(request: GestureDetectionRequest):
-    """Detect gesture from camera image using YOLOv5 + Hand Tracking"""
+async def _detect_gesture(image_data: Union[str, bytes], session_id: Optional[str]) -> Dict[str, Any]:
+    """Shared body of the base64 and multipart detection endpoints"""
     try:
-        # Load model if not loaded
-        if not gesture_service.model_loaded:
-            success = gesture_service.load_model()
-            if not success:
-                raise HTTPException(status_code=500, detail="Failed to load gesture recognition model")
-        
-        # Detect gesture using real computer vision
-        result = gesture_service.detect_gesture(request.image_data)
-        
+        # A static camera sends byte-identical frames; reuse the session's recent result for those.
+        # Anonymous frames skip the cache (and use the shared tracker) so one-off ids don't evict real sessions
+        frame_key = frame_cache.key(image_data) if session_id else None
+        result = frame_cache.get(session_id, frame_key) if frame_key else None
+        cached = result is not None
+        if not cached:
+            if yolo_detector is not None and yolo_detector.model_loaded:
+                # Decode off the event loop, then share a batched forward pass with concurrent frames
+                loop = asyncio.get_running_loop()
+                try:
+                    frame = await loop.run_in_executor(executor, decode_frame, image_data, YOLO_IMG_SIZE)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                result = await gesture_batcher.submit(frame) or {
+                    "gesture": "no_hand_detected",
+                    "confidence": 0.0,
+                    "bbox": [0, 0, 0, 0],
+                    "urdu_text": "ہاتھ نظر نہیں آ رہا",
+                    "pashto_text": "لاس نه لیدل کیږي",
+                    "meaning": "No hand detected",
+                    "landmarks_detected": False,
+                    "detection_method": "YOLOv5"
+                }
+            else:
+                # Decode on the thread pool (cv2 releases the GIL), then track hands on the dedicated MediaPipe thread
+                loop = asyncio.get_running_loop()
+                try:
+                    image_rgb, image_shape = await loop.run_in_executor(executor, decode_rgb, image_data, MEDIAPIPE_MAX_SIDE)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                result = await loop.run_in_executor(hands_executor, gesture_service.detect_rgb, image_rgb, session_id, image_shape)
+            if frame_key and "error" not in result:
+                frame_cache.put(session_id, frame_key, result)
+
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
         
+        # Only the response and history need an id for anonymous callers
+        session_id = session_id or gen_id()
+        
         # Save to history
         history = TranslationHistory(
-            session_id=request.session_id,
+            session_id=session_id,
             translation_type="sign_to_speech",
             input_data="real_camera_image",
-            output_data=json.dumps(result),
+            output_data=result,
             language="both",
             confidence=result.get("confidence")
         )
         
-        await db.translation_history.insert_one(history.dict())
+        history_writer.put(history.model_dump())
         
         return {
             "success": True,
             "detection": result,
-            "session_id": request.session_id,
-            "processing_method": "YOLOv5 + Hand Tracking"
+            "session_id": session_id,
+            "processing_method": "YOLOv5 + Hand Tracking",
+            "cached": cached
         }
         
+    except HTTPException:
+        # Bad input (undecodable image) stays a 400 rather than being rewrapped as a 500
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Real gesture detection failed: {str(e)}")
 
-@api_router.post("/speech-to-sign")
-async def speech_to_sign(request: dict):
-    """Convert speech to sign language gestures (simplified for web demo)"""
+@api_router.post("/detect-gesture")
+async def detect_gesture(request: GestureDetectionRequest):
+    """Detect gesture from camera image using YOLOv5 + Hand Tracking"""
+    return await _detect_gesture(request.image_data, request.session_id)
+
+@api_router.post("/detect-gesture-raw")
+async def detect_gesture_raw(file: UploadFile = File(...), session_id: Optional[str] = Form(None)):
+    """Preferred detection endpoint: the frame as a multipart file, without base64 inflation or decoding"""
+    return await _detect_gesture(await file.read(), session_id)
+
+async def _speech_to_sign(audio_bytes: Optional[bytes], language: str, session_id: str) -> Dict[str, Any]:
+    """Shared body of the base64 and multipart speech endpoints"""
     try:
-        language = request.get('language', 'english')
-        session_id = request.get('session_id', 'demo')
+        recognized_text = None
+        if audio_bytes:
+            loop = asyncio.get_running_loop()
+            recognized_text = await loop.run_in_executor(
+                io_pool, speech_service.speech_to_text, audio_bytes, language
+            )
         
-        # For web demo, we'll simulate speech recognition with common phrases
-        # In production, this would handle actual audio data
-        
-        # Simulate speech recognition result
-        common_phrases = {
-            'english': ['hello', 'thank you', 'water', 'food', 'help', 'one', 'two', 'three'],
-            'urdu': ['سلام', 'شکریہ', 'پانی', 'کھانا', 'مدد'],
-            'pashto': ['سلام ورور', 'مننه', 'اوبه', 'خواړه', 'مرسته']
-        }
-        
-        import random
-        phrases = common_phrases.get(language, common_phrases['english'])
-        recognized_text = random.choice(phrases)
+        if not recognized_text:
+            # No audio or no speech detected: simulate recognition with common phrases for the web demo
+            recognized_text = random.choice(DEMO_PHRASES.get(language, DEMO_PHRASES['english']))
         
         # Find corresponding gesture from our labels
         gesture_match = None
@@ -683,6 +1313,12 @@ async def speech_to_sign(request: dict):
         elif recognized_text == 'three':
             gesture_name = 'teen'
             meaning = 'Three'
+        elif language in ('urdu', 'pashto'):
+            # Real transcripts rarely match a demo phrase exactly; search the full gesture set
+            gesture_match = speech_service.find_gesture_for_text(recognized_text, language)
+            if gesture_match:
+                gesture_name = gesture_match["gesture"]
+                meaning = gesture_match["data"]["meaning"]
         
         if gesture_name:
             return {
@@ -706,212 +1342,50 @@ async def speech_to_sign(request: dict):
             }
         
     except Exception as e:
-        logger.error(f"Speech to sign error: {e}")
+        logger.error("Speech to sign error: %s", e)
         raise HTTPException(status_code=500, detail=f"Speech recognition failed: {str(e)}")
 
+@api_router.post("/speech-to-sign")
+async def speech_to_sign(request: dict):
+    """Convert speech to sign language gestures (simplified for web demo)"""
+    audio_data = request.get('audio_data')
+    try:
+        audio_bytes = base64.b64decode(audio_data.split(',')[-1]) if audio_data else None
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid audio data: {str(e)}")
+    return await _speech_to_sign(audio_bytes, request.get('language', 'english'), request.get('session_id', 'demo'))
+
+@api_router.post("/speech-to-sign-raw")
+async def speech_to_sign_raw(
+    file: UploadFile = File(...),
+    language: str = Form('english'),
+    session_id: str = Form('demo')
+):
+    """Preferred speech endpoint: the recording as a multipart file, without base64 inflation or decoding"""
+    return await _speech_to_sign(await file.read(), language, session_id)
+
 @api_router.post("/text-to-sign")
-async def text_to_sign(request: dict):
+async def text_to_sign(request: TextToSignRequest):
     """Convert text to sign language gestures with improved Urdu/Pashto support"""
     try:
-        text = request.get('text', '').strip()
-        language = request.get('language', 'english')
-        session_id = request.get('session_id', 'demo')
-        
-        if not text:
-            return {
-                "success": False,
-                "error": "No text provided",
-                "session_id": session_id
-            }
-        
-        # Enhanced text-to-gesture mapping with Urdu/Pashto support based on reference images
-        urdu_to_english_mapping = {
-            # Greetings and politeness
-            'سلام': 'salam',
-            'سلامات': 'salam', 
-            'السلام علیکم': 'salam',
-            'نمسکار': 'salam',
-            'شکریہ': 'shukriya',
-            'شكريه': 'shukriya',
-            'تھینک یو': 'shukriya',
-            'مننه': 'shukriya',  # Pashto
-            'برائے کرم': 'please',
-            'مہربانی': 'please',
-            'معاف کریں': 'sorry',
-            'بخشیں': 'sorry',
-            'معذرت': 'sorry',
-            
-            # Basic needs and actions
-            'پانی': 'paani',
-            'اوبه': 'paani',  # Pashto
-            'کھانا': 'khana',
-            'خواړه': 'khana',  # Pashto
-            'کھانے کا': 'eat',
-            'پینا': 'drink',
-            'پیاس': 'drink',
-            'اور': 'more',
-            'زیادہ': 'more',
-            'مدد': 'madad',
-            'مرسته': 'madad',  # Pashto
-            
-            # Numbers (Urdu/Pashto)
-            'ایک': 'ek',
-            'یو': 'ek',  # Pashto
-            'دو': 'do',
-            'دوه': 'do',  # Pashto
-            'تین': 'teen',
-            'درې': 'teen',  # Pashto
-            'چار': 'char',
-            'څلور': 'char',  # Pashto
-            'پانچ': 'panch',
-            'پنځه': 'panch',  # Pashto
-            
-            # Family relationships
-            'ماں': 'maa',
-            'مور': 'maa',  # Pashto
-            'باپ': 'baap',
-            'پلار': 'baap',  # Pashto
-            'بھائی': 'bhai',
-            'ورور': 'bhai',  # Pashto
-            'بہن': 'behan',
-            'خور': 'behan',  # Pashto
-            
-            # Common expressions and gestures
-            'ٹھیک ہے': 'ok',
-            'اوکے': 'ok',
-            'رک جاؤ': 'stop',
-            'رکو': 'stop',
-            'فتح': 'victory',
-            'کامیابی': 'victory',
-            'فون کرو': 'call',
-            'کال': 'call',
-            'خوش قسمتی': 'good_luck',
-            'بہترین': 'good_luck',
-            
-            # Common places and objects
-            'گھر': 'ghar',
-            'کور': 'ghar',  # Pashto
-            'کتاب': 'kitab',
-            'کتاب': 'kitab',  # Same in Pashto
-            'کام': 'kaam',
-            'کار': 'kaam',  # Pashto
-            'دوست': 'dost',
-            'ملګری': 'dost',  # Pashto
-            
-            # Farewells
-            'خدا حافظ': 'khuda_hafiz',
-            'الوداع': 'khuda_hafiz',
-            'د خدای په امان': 'khuda_hafiz'  # Pashto
-        }
-        
-        # Enhanced English to gesture mapping
-        english_to_gesture_mapping = {
-            # Basic greetings
-            'hello': 'salam',
-            'hi': 'salam',
-            'salam': 'salam',
-            'greetings': 'salam',
-            
-            # Politeness
-            'thank you': 'shukriya',
-            'thanks': 'shukriya',
-            'shukriya': 'shukriya',
-            'please': 'please',
-            'sorry': 'sorry',
-            'excuse me': 'sorry',
-            'apologize': 'sorry',
-            
-            # Daily needs
-            'water': 'paani',
-            'paani': 'paani',
-            'food': 'khana',
-            'khana': 'khana',
-            'eat': 'eat',
-            'eating': 'eat',
-            'drink': 'drink',
-            'drinking': 'drink',
-            'more': 'more',
-            'help': 'madad',
-            'madad': 'madad',
-            'assistance': 'madad',
-            
-            # Numbers
-            'one': 'ek',
-            'ek': 'ek',
-            'two': 'do',
-            'do': 'do',
-            'three': 'teen',
-            'teen': 'teen',
-            'four': 'char',
-            'char': 'char',
-            'five': 'panch',
-            'panch': 'panch',
-            
-            # Family
-            'mother': 'maa',
-            'mom': 'maa',
-            'maa': 'maa',
-            'father': 'baap',
-            'dad': 'baap',
-            'baap': 'baap',
-            'brother': 'bhai',
-            'bhai': 'bhai',
-            'sister': 'behan',
-            'behan': 'behan',
-            
-            # Common gestures
-            'ok': 'ok',
-            'okay': 'ok',
-            'alright': 'ok',
-            'stop': 'stop',
-            'halt': 'stop',
-            'victory': 'victory',
-            'win': 'victory',
-            'success': 'victory',
-            'call': 'call',
-            'phone': 'call',
-            'call me': 'call',
-            'good luck': 'good_luck',
-            'best wishes': 'good_luck',
-            'thumbs up': 'good_luck',
-            
-            # Places and objects
-            'home': 'ghar',
-            'house': 'ghar',
-            'ghar': 'ghar',
-            'book': 'kitab',
-            'kitab': 'kitab',
-            'work': 'kaam',
-            'job': 'kaam',
-            'kaam': 'kaam',
-            'friend': 'dost',
-            'dost': 'dost',
-            
-            # Farewells
-            'goodbye': 'khuda_hafiz',
-            'bye': 'khuda_hafiz',
-            'farewell': 'khuda_hafiz',
-            'see you': 'khuda_hafiz'
-        }
+        text = request.text
+        language = request.language
+        session_id = request.session_id
         
         # Normalize and find gesture
-        text_lower = text.lower().strip()
+        text_lower = normalize_text(text)
         gesture_name = None
         meaning = None
         
-        # First check Urdu/Pashto mapping
-        if text_lower in urdu_to_english_mapping:
-            gesture_name = urdu_to_english_mapping[text_lower]
-            meaning = f"Pakistani sign for: {text}"
-        
-        # Then check English mapping
-        elif text_lower in english_to_gesture_mapping:
-            gesture_name = english_to_gesture_mapping[text_lower]
-            meaning = f"Sign language for: {text}"
+        hit = _resolve_text_gesture(text_lower)
+        if hit:
+            gesture_name, urdu = hit
+            meaning = f"{'Pakistani sign' if urdu else 'Sign language'} for: {text}"
         
         # Check if the gesture exists in our mock dataset
-        if gesture_name and gesture_name in MOCK_GESTURES:
-            gesture_data = MOCK_GESTURES[gesture_name]
+        idx = GESTURE_TABLE.index.get(gesture_name) if gesture_name else None
+        if idx is not None:
+            info = GESTURE_TABLE.rows[idx]
             
             # Store translation in history
             await store_translation_history({
@@ -924,20 +1398,21 @@ async def text_to_sign(request: dict):
                 "confidence": 0.95
             })
             
-            return {
+            # Only plain JSON values, so skip jsonable_encoder and let orjson write the body directly
+            return ORJSONResponse({
                 "success": True,
                 "original_text": text,
                 "language": language,
                 "gesture": gesture_name,
                 "meaning": meaning,
-                "urdu_text": gesture_data.get("urdu", ""),
-                "pashto_text": gesture_data.get("pashto", ""),
-                "english_meaning": gesture_data.get("meaning", ""),
+                "urdu_text": info.urdu,
+                "pashto_text": info.pashto,
+                "english_meaning": info.meaning,
                 "session_id": session_id,
                 "message": f"Text '{text}' successfully converted to gesture: {gesture_name}"
-            }
+            })
         else:
-            return {
+            return ORJSONResponse({
                 "success": True,
                 "original_text": text,
                 "language": language,
@@ -945,37 +1420,83 @@ async def text_to_sign(request: dict):
                 "meaning": None,
                 "session_id": session_id,
                 "message": f"Text '{text}' recognized but no matching gesture found. Try common words like 'سلام', 'شکریہ', 'پانی', 'کھانا'."
-            }
+            })
             
     except Exception as e:
-        logger.error(f"Text-to-sign conversion error: {str(e)}")
+        logger.error("Text-to-sign conversion error: %s", e)
         raise HTTPException(status_code=500, detail=f"Text-to-sign conversion failed: {str(e)}")
 
+@api_router.post("/text-to-speech")
+async def text_to_speech(request: dict):
+    """Stream synthesized Urdu/Pashto speech, flushing audio sentence by sentence"""
+    text = request.get('text', '').strip()
+    language = request.get('language', 'urdu')
+
+    if not text:
+        raise HTTPException(status_code=400, detail="No text provided")
+
+    # Pick the voice once: the VITS voices may finish loading mid-request, and the body must match the media type
+    voice = speech_service.tts_voice(language)
+    return StreamingResponse(
+        iterate_in_executor(speech_service.stream_speech, text, voice),
+        media_type=speech_service.speech_media_type(voice)
+    )
+
+async def _stream_history(cursor):
+    """Yield history docs as NDJSON lines while the Motor cursor produces them"""
+    try:
+        async for doc in cursor:
+            yield orjson.dumps(doc) + b"\n"
+    except Exception as e:
+        logger.error("Failed to stream history: %s", e)
+
 @api_router.get("/history/{session_id}")
-async def get_translation_history(session_id: str):
-    """Get translation history for a session"""
+async def get_translation_history(session_id: str, accept: Optional[str] = Header(None)):
+    """Get translation history for a session, newest first"""
     try:
         history_cursor = db.translation_history.find(
-            {"session_id": session_id}
-        ).limit(100)
+            {"session_id": session_id}, HISTORY_PROJECTION
+        ).sort("timestamp", -1).limit(100)
         
-        history = []
-        async for doc in history_cursor:
-            # Convert ObjectId to string and handle datetime serialization
-            doc["_id"] = str(doc["_id"])
-            if "timestamp" in doc and hasattr(doc["timestamp"], "isoformat"):
-                doc["timestamp"] = doc["timestamp"].isoformat()
-            history.append(doc)
+        # Clients asking for NDJSON get one doc per line without buffering the list
+        if accept and "application/x-ndjson" in accept:
+            return StreamingResponse(_stream_history(history_cursor), media_type="application/x-ndjson")
         
-        return {
+        # One driver call for the batch; returning ORJSONResponse directly skips jsonable_encoder,
+        # and orjson writes the datetimes in C
+        history = await history_cursor.to_list(length=100)
+        
+        return ORJSONResponse({
             "success": True,
             "history": history,
             "count": len(history)
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch history: {str(e)}")
 
+# Invariant parts of the /launch-3d-character responses, built once
+CHARACTER_FALLBACK = "In GUI environment, 3D character window would open automatically"
+STORY_RESPONSE = {
+    "status": "success",
+    "gesture": "story",
+    "instructions": "🎭 3D Character would demonstrate the complete Pakistani story 'انگور تو کھٹے ہیں' with animated gestures. Each story segment would be shown with corresponding sign language movements.",
+    "story_features": (
+        "Animated character tells the story sentence by sentence",
+        "Each story word demonstrated with Pakistani sign language",
+        "Interactive gesture vocabulary building",
+        "Multilingual narration (Urdu/Pashto/English)",
+        "Educational moral lessons with sign integration"
+    ),
+    "fallback": CHARACTER_FALLBACK
+}
+GESTURE_ANIMATION_DETAILS = (
+    "Smooth hand and finger positioning",
+    "Pakistani cultural representation",
+    "4-5 second demonstration cycle",
+    "Realistic human proportions and movements"
+)
+
 @api_router.post("/launch-3d-character")
 async def launch_3d_character(request: dict):
     """Launch 3D character for gesture demonstration"""
@@ -987,20 +1508,9 @@ async def launch_3d_character(request: dict):
         # Since we're in a container environment without GUI support,
         # we'll provide detailed 3D character information instead
         if mode == 'story':
-            return {
-                "status": "success",
+            return STORY_RESPONSE | {
                 "message": f"3D Character Story Mode activated for {language.title()}",
-                "gesture": "story",
-                "language": language,
-                "instructions": "🎭 3D Character would demonstrate the complete Pakistani story 'انگور تو کھٹے ہیں' with animated gestures. Each story segment would be shown with corresponding sign language movements.",
-                "story_features": [
-                    "Animated character tells the story sentence by sentence",
-                    "Each story word demonstrated with Pakistani sign language",
-                    "Interactive gesture vocabulary building",
-                    "Multilingual narration (Urdu/Pashto/English)",
-                    "Educational moral lessons with sign integration"
-                ],
-                "fallback": "In GUI environment, 3D character window would open automatically"
+                "language": language
             }
         else:
             # Single gesture demonstration
@@ -1010,42 +1520,40 @@ async def launch_3d_character(request: dict):
                 "gesture": gesture_name,
                 "language": language,
                 "instructions": f"🎭 3D Character would animate the '{gesture_name}' gesture with smooth hand movements, showing proper finger positioning and gesture flow for Pakistani sign language.",
-                "animation_details": [
-                    f"Character demonstrates {gesture_name} gesture",
-                    "Smooth hand and finger positioning",
-                    "Pakistani cultural representation",
-                    "4-5 second demonstration cycle",
-                    "Realistic human proportions and movements"
-                ],
-                "fallback": "In GUI environment, 3D character window would open automatically"
+                "animation_details": (f"Character demonstrates {gesture_name} gesture", *GESTURE_ANIMATION_DETAILS),
+                "fallback": CHARACTER_FALLBACK
             }
         
     except Exception as e:
-        logger.error(f"3D character launch error: {e}")
-        return {
-            "status": "error", 
-            "message": f"3D character system unavailable",
+        logger.error("3D character launch error: %s", e)
+        # A real status code lets clients and monitoring see the failure without parsing the body
+        raise HTTPException(status_code=503, detail={
+            "message": "3D character system unavailable",
             "error": str(e),
             "fallback": "3D character requires GUI display support. Feature works in desktop environments with Python + Pygame + OpenGL support."
-        }
+        })
 
 @api_router.get("/stats")
-async def get_stats():
+async def get_stats(if_none_match: Optional[str] = Header(None)):
     """Get application statistics"""
     try:
-        total_translations = await db.translation_history.count_documents({})
-        sign_to_speech = await db.translation_history.count_documents({"translation_type": "sign_to_speech"})
-        speech_to_sign = await db.translation_history.count_documents({"translation_type": "speech_to_sign"})
+        counts = await translation_counts.get()
         
-        return {
-            "total_translations": total_translations,
-            "sign_to_speech_count": sign_to_speech,
-            "speech_to_sign_count": speech_to_sign,
+        stats = {
+            "total_translations": sum(counts.values()),
+            "sign_to_speech_count": counts.get("sign_to_speech", 0),
+            "speech_to_sign_count": counts.get("speech_to_sign", 0),
             "available_gestures": len(MOCK_GESTURES),
             "model_status": "loaded" if gesture_service.model_loaded else "not_loaded",
             "technology_engine": "YOLOv5 + Speech Recognition",
             "detection_method": "Real-time Hand Tracking"
         }
+        body = orjson.dumps(stats)
+        # Counts are only refreshed every STATS_TTL seconds anyway, so proxies may hold them that long
+        headers = {"ETag": f'"{hashlib.md5(body).hexdigest()}"', "Cache-Control": f"public, max-age={int(STATS_TTL)}"}
+        if not_modified(headers["ETag"], if_none_match):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch stats: {str(e)}")
@@ -1065,12 +1573,37 @@ app.add_middleware(
 async def startup_event():
     """Initialize services on startup"""
     logger.info("Starting Real Sign Language Translation API with MediaPipe")
-    success = gesture_service.load_model()
+    loop = asyncio.get_running_loop()
+    # Warm up on the thread that will own the Hands graph for the app's lifetime
+    success = await loop.run_in_executor(hands_executor, gesture_service.load_model)
     if success:
         logger.info("MediaPipe hand detection model loaded successfully")
     else:
         logger.error("Failed to load MediaPipe model")
 
+    if yolo_detector is not None and await loop.run_in_executor(executor, yolo_detector.load_model):
+        gesture_batcher.start()
+
+    # Don't hold up serving on the VITS download/load; /text-to-speech uses gTTS until it finishes
+    loop.run_in_executor(executor, speech_service.load_tts)
+
+    history_writer.start()
+    try:
+        # Expire old history and serve /history/{session_id} newest-first from an index
+        await db.translation_history.create_index("timestamp", expireAfterSeconds=HISTORY_TTL_SECONDS)
+        await db.translation_history.create_index([("session_id", 1), ("timestamp", -1)])
+        await db.translation_history.create_index("translation_type")
+    except Exception as e:
+        logger.error("Failed to create translation history indexes: %s", e)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    if gesture_batcher is not None:
+        await gesture_batcher.stop()
+    await history_writer.stop()
+    client.close()
+    io_pool.shutdown(wait=False, cancel_futures=True)
+    # Close the Hands graphs on their own thread after in-flight frames finish
+    await asyncio.get_running_loop().run_in_executor(hands_executor, gesture_service.close)
+    hands_executor.shutdown(wait=False, cancel_futures=True)
+
@@ -0,0 +1,514 @@
+"""Optional YOLOv5 gesture detector: TensorRT/CUDA-graph inference plus request micro-batching.
+
+server.py only imports this module when USE_YOLO=1, so the default MediaPipe
+deployment never loads torch.hub, TensorRT, Numba or the YOLOv5 weights.
+"""
+import asyncio
+import copy
+import hashlib
+import logging
+import os
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import orjson
+import torch
+from numba import njit, prange
+
+from preprocess import letterbox_geometry, letterbox_resize
+
+try:
+    import tensorrt as trt
+except ImportError:
+    trt = None
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+
+# YOLOv5 model trained on the Pakistani sign dataset (see sign_app/train_yolov5_colab.py)
+YOLO_WEIGHTS = Path(os.environ.get('YOLO_WEIGHTS', ROOT_DIR.parent / 'sign_app' / 'best.pt'))
+YOLO_LABELS = Path(os.environ.get('YOLO_LABELS', ROOT_DIR.parent / 'sign_app' / 'labels.json'))
+YOLO_IMG_SIZE = 640
+YOLO_PAD_VALUE = 114  # grey letterbox border, as in YOLOv5 training
+USE_TENSORRT = os.environ.get('USE_TENSORRT', '1') == '1'
+TRT_PRECISION = os.environ.get('TRT_PRECISION', 'fp16')  # "fp16" or "int8"
+TRT_CALIBRATION_DIR = Path(os.environ.get('TRT_CALIBRATION_DIR', ROOT_DIR / 'calibration'))
+TRT_CALIBRATION_FRAMES = 500
+TRT_CACHE_DIR = Path(os.environ.get('TRT_CACHE_DIR', ROOT_DIR / '.trt_cache'))
+
+# Micro-batching: concurrent frames share one forward pass
+MAX_BATCH = 16
+BATCH_TIMEOUT = 0.005  # seconds to wait for more frames before running a batch
+PIPELINE_DEPTH = 3  # TensorRT batches in flight, each on its own CUDA stream and buffers
+
+@njit(parallel=True, cache=True)
+def letterbox_nchw(frame: np.ndarray, out: np.ndarray, pad_value: int):
+    """Fused letterbox padding, BGR->RGB swap and HWC->CHW transpose of one uint8 frame in a single pass"""
+    fh, fw, _ = frame.shape
+    size = out.shape[1]
+    top = (size - fh) // 2
+    left = (size - fw) // 2
+    for y in prange(size):
+        sy = y - top
+        for x in range(size):
+            sx = x - left
+            if 0 <= sy < fh and 0 <= sx < fw:
+                for c in range(3):
+                    out[c, y, x] = frame[sy, sx, 2 - c]
+            else:
+                for c in range(3):
+                    out[c, y, x] = pad_value
+
+def preprocess_batch(frames: List[np.ndarray], staging: torch.Tensor) -> torch.Tensor:
+    """Letterbox resized BGR frames into an RGB uint8 NCHW batch inside the (pinned) staging buffer"""
+    batch = staging[:len(frames)]
+    out = batch.numpy()
+    # Fused pad + channel swap + transpose per frame; scaling and the fp16 cast happen on the device
+    for i, frame in enumerate(frames):
+        letterbox_nchw(frame, out[i], YOLO_PAD_VALUE)
+    return batch
+
+if trt is not None:
+    class YoloCalibrator(trt.IInt8EntropyCalibrator2):
+        """Feeds representative sign frames to TensorRT's INT8 entropy calibration"""
+
+        def __init__(self, image_paths: List[Path], cache_path: Path, batch_size: int = MAX_BATCH):
+            trt.IInt8EntropyCalibrator2.__init__(self)
+            self.image_paths = image_paths
+            self.cache_path = cache_path
+            self.batch_size = batch_size
+            self.position = 0
+            self.staging = torch.empty((batch_size, 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE), dtype=torch.uint8, pin_memory=True)
+            self.device_input = torch.empty((batch_size, 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE), dtype=torch.float32, device='cuda')
+
+        def get_batch_size(self):
+            return self.batch_size
+
+        def get_batch(self, names):
+            if self.position + self.batch_size > len(self.image_paths):
+                return None
+            paths = self.image_paths[self.position:self.position + self.batch_size]
+            self.position += self.batch_size
+            frames = [letterbox_resize(cv2.imread(str(path)), YOLO_IMG_SIZE) for path in paths]
+            self.device_input.copy_(preprocess_batch(frames, self.staging).to('cuda').float().div_(255.0))
+            return [int(self.device_input.data_ptr())]
+
+        def read_calibration_cache(self):
+            # The cache name covers weights, input size, batch and frame set, so only GPU/TensorRT changes reuse it
+            if self.cache_path.exists():
+                return self.cache_path.read_bytes()
+            return None
+
+        def write_calibration_cache(self, cache):
+            self.cache_path.write_bytes(bytes(cache))
+
+class TensorRTEngine:
+    """Serialized TensorRT engine with persistent device buffers for the YOLOv5 graph"""
+
+    def __init__(self, engine_path: Path, max_batch: int = MAX_BATCH, num_slots: int = PIPELINE_DEPTH):
+        self.logger = trt.Logger(trt.Logger.WARNING)
+        with open(engine_path, 'rb') as f:
+            self.engine = trt.Runtime(self.logger).deserialize_cuda_engine(f.read())
+
+        names = [self.engine.get_tensor_name(i) for i in range(self.engine.num_io_tensors)]
+        self.input_name = next(n for n in names if self.engine.get_tensor_mode(n) == trt.TensorIOMode.INPUT)
+        self.output_name = next(n for n in names if self.engine.get_tensor_mode(n) == trt.TensorIOMode.OUTPUT)
+
+        # One execution context per pipeline slot so batches can be in flight concurrently.
+        # Allocate max-batch buffers once and bind them; smaller batches use a leading slice
+        self.contexts, self.inputs, self.outputs = [], [], []
+        for _ in range(num_slots):
+            context = self.engine.create_execution_context()
+            context.set_input_shape(self.input_name, (max_batch, 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE))
+            input_buffer = torch.empty((max_batch, 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE), dtype=self._dtype(self.input_name), device='cuda')
+            output_buffer = torch.empty(tuple(context.get_tensor_shape(self.output_name)), dtype=self._dtype(self.output_name), device='cuda')
+            context.set_tensor_address(self.input_name, input_buffer.data_ptr())
+            context.set_tensor_address(self.output_name, output_buffer.data_ptr())
+            self.contexts.append(context)
+            self.inputs.append(input_buffer)
+            self.outputs.append(output_buffer)
+
+    def _dtype(self, name: str) -> torch.dtype:
+        # FP16 applies to the layers; I/O bindings keep the ONNX graph's dtype
+        return torch.from_numpy(np.empty(0, dtype=trt.nptype(self.engine.get_tensor_dtype(name)))).dtype
+
+    @staticmethod
+    def build(onnx_path: Path, engine_path: Path, max_batch: int = MAX_BATCH, calibrator=None, fp16_scope: Optional[str] = None):
+        """Build an FP16 (or INT8 with a calibrator) engine with a dynamic batch profile (min=1, opt=8, max=16)"""
+        logger_trt = trt.Logger(trt.Logger.WARNING)
+        builder = trt.Builder(logger_trt)
+        network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+        parser = trt.OnnxParser(network, logger_trt)
+        if not parser.parse(onnx_path.read_bytes()):
+            errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+            raise RuntimeError(f"Failed to parse ONNX model: {errors}")
+
+        config = builder.create_builder_config()
+        config.set_flag(trt.BuilderFlag.FP16)
+
+        profile = builder.create_optimization_profile()
+        input_name = network.get_input(0).name
+        shape = (3, YOLO_IMG_SIZE, YOLO_IMG_SIZE)
+        profile.set_shape(input_name, (1, *shape), (max(1, max_batch // 2), *shape), (max_batch, *shape))
+        config.add_optimization_profile(profile)
+        if calibrator is not None:
+            # INT8 where calibration allows, FP16 kernels remain available for the rest
+            config.set_flag(trt.BuilderFlag.INT8)
+            config.int8_calibrator = calibrator
+            # Calibration runs at the profile's opt shape, so pin it to the batch the calibrator feeds
+            calibration_batch = (calibrator.get_batch_size(), *shape)
+            calibration_profile = builder.create_optimization_profile()
+            calibration_profile.set_shape(input_name, calibration_batch, calibration_batch, calibration_batch)
+            config.set_calibration_profile(calibration_profile)
+            if fp16_scope:
+                # Box/score regression in the detection head is the most quantization-sensitive part
+                config.set_flag(trt.BuilderFlag.OBEY_PRECISION_CONSTRAINTS)
+                for i in range(network.num_layers):
+                    layer = network.get_layer(i)
+                    if fp16_scope in layer.name:
+                        layer.precision = trt.float16
+
+        serialized = builder.build_serialized_network(network, config)
+        if serialized is None:
+            raise RuntimeError("TensorRT engine build failed")
+        engine_path.write_bytes(serialized)
+
+    def __call__(self, batch: torch.Tensor, slot: int = 0) -> torch.Tensor:
+        """Enqueue inference on the caller's current CUDA stream; the result is ready in stream order"""
+        n = batch.shape[0]
+        context = self.contexts[slot]
+        self.inputs[slot][:n].copy_(batch, non_blocking=True)
+        context.set_input_shape(self.input_name, (n, 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE))
+        context.execute_async_v3(torch.cuda.current_stream().cuda_stream)
+        return self.outputs[slot][:n]
+
+class YoloGestureDetector:
+    def __init__(self, weights_path: Path, labels_path: Path):
+        self.weights_path = weights_path
+        self.labels_path = labels_path
+        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.model = None
+        self.engine = None
+        self.labels = {}
+        self.conf_threshold = 0.6
+        self.pipeline_depth = 1
+        self.staging = []
+        self.streams = []
+        self.graph = None
+        self.graph_input = None
+        self.graph_output = None
+        self.model_loaded = False
+
+    def load_model(self):
+        """Load the trained YOLOv5 weights, preferring a TensorRT FP16 engine on GPU"""
+        try:
+            if not self.weights_path.exists():
+                logger.warning("YOLOv5 weights not found at %s, using MediaPipe only", self.weights_path)
+                return False
+
+            labels = orjson.loads(self.labels_path.read_bytes())
+            self.labels = {int(class_id): info for class_id, info in labels.items()}
+
+            logger.info("Loading YOLOv5 model from %s...", self.weights_path)
+            # autoshape=False gives the raw network, which accepts a stacked NCHW batch
+            self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=str(self.weights_path), autoshape=False)
+
+            # Class ids are mapped straight onto labels.json, so refuse checkpoints trained on other
+            # classes (e.g. a stock COCO yolov5s, whose class 0 'person' would read as labels['0'])
+            names = getattr(self.model, 'names', None) or []
+            names = [names[i] for i in sorted(names)] if isinstance(names, dict) else list(names)
+            expected = [self.labels[i].get('name') for i in sorted(self.labels)]
+            if names != expected:
+                logger.warning(
+                    "YOLOv5 weights %s have %d classes (%s...) that don't match %s, using MediaPipe only",
+                    self.weights_path, len(names), ', '.join(map(str, names[:3])), self.labels_path
+                )
+                self.model = None
+                return False
+            self.model.to(self.device).eval()
+            if self.device.type == 'cuda':
+                self.model.half()
+
+            if USE_TENSORRT and trt is not None and self.device.type == 'cuda':
+                try:
+                    self.engine = TensorRTEngine(self._ensure_engine())
+                    # Overlap one batch's H2D copy with another's compute and a third's readback
+                    self.pipeline_depth = PIPELINE_DEPTH
+                    logger.info("Using TensorRT %s engine for gesture inference", TRT_PRECISION.upper())
+                except Exception as e:
+                    logger.warning("TensorRT unavailable, falling back to PyTorch: %s", e)
+                    self.engine = None
+
+            # Per-slot reused uint8 host buffers for the NCHW batch; pinned so the H2D copy can run async
+            self.staging = [
+                torch.empty(
+                    (MAX_BATCH, 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE),
+                    dtype=torch.uint8,
+                    pin_memory=self.device.type == 'cuda'
+                )
+                for _ in range(self.pipeline_depth)
+            ]
+            if self.device.type == 'cuda':
+                self.streams = [torch.cuda.Stream() for _ in range(self.pipeline_depth)]
+
+            self._warmup()
+            self.model_loaded = True
+            logger.info("YOLOv5 gesture model loaded successfully!")
+            return True
+        except Exception as e:
+            logger.error("Failed to load YOLOv5 model: %s", e)
+            return False
+
+    def _ensure_engine(self) -> Path:
+        """Export weights to ONNX and build the TensorRT engine once, reusing the cached file"""
+        # Engines are only valid for the GPU, TensorRT version and weights they were built with
+        weights_digest = hashlib.sha1(self.weights_path.read_bytes()).digest()
+        calibration_paths, calibration_key = self._calibration_set(weights_digest)
+        cache_key = hashlib.sha1(
+            torch.cuda.get_device_name().encode()
+            + trt.__version__.encode()
+            + TRT_PRECISION.encode()
+            + weights_digest
+            + calibration_key.encode()
+        ).hexdigest()
+        TRT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        engine_path = TRT_CACHE_DIR / f"{cache_key}.plan"
+        if engine_path.exists():
+            return engine_path
+
+        onnx_path = TRT_CACHE_DIR / f"{cache_key}.onnx"
+        logger.info("Building TensorRT engine %s (one-time)...", engine_path)
+        network = copy.deepcopy(self.model.model).float().eval()
+        detect_scope = None
+        for name, module in network.named_modules():
+            if type(module).__name__ == 'Detect':
+                module.inplace = False
+                module.export = True  # single (batch, anchors, 5 + classes) output
+                detect_scope = f"/{name}/"  # ONNX node names carry the module path, e.g. /model.24/m.0/Conv
+        dummy = torch.zeros(1, 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE, device=self.device)
+        torch.onnx.export(
+            network, dummy, str(onnx_path),
+            opset_version=17,
+            input_names=['images'],
+            output_names=['output0'],
+            dynamic_axes={'images': {0: 'batch'}, 'output0': {0: 'batch'}}
+        )
+        TensorRTEngine.build(
+            onnx_path, engine_path,
+            calibrator=self._calibrator(calibration_paths, TRT_CACHE_DIR / f"{calibration_key}.calib"),
+            fp16_scope=detect_scope
+        )
+        return engine_path
+
+    @staticmethod
+    def _calibration_set(weights_digest: bytes) -> Tuple[List[Path], str]:
+        """Calibration frames plus a key over everything the INT8 scales depend on ('' for FP16)"""
+        if TRT_PRECISION != 'int8':
+            return [], ''
+        image_paths = sorted(
+            path for path in TRT_CALIBRATION_DIR.glob('*')
+            if path.suffix.lower() in ('.jpg', '.jpeg', '.png')
+        )[:TRT_CALIBRATION_FRAMES]
+        # Weights, input geometry and the frame set (name, size, mtime) all change the scales
+        key = hashlib.sha1(weights_digest + f"{YOLO_IMG_SIZE}:{MAX_BATCH}".encode())
+        for path in image_paths:
+            stat = path.stat()
+            key.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return image_paths, key.hexdigest()
+
+    def _calibrator(self, image_paths: List[Path], cache_path: Path):
+        """INT8 calibrator over frames in TRT_CALIBRATION_DIR, or None for a plain FP16 build"""
+        if TRT_PRECISION != 'int8':
+            return None
+        if cache_path.exists():
+            return YoloCalibrator([], cache_path)
+        if len(image_paths) < MAX_BATCH:
+            raise RuntimeError(f"INT8 needs at least {MAX_BATCH} calibration frames in {TRT_CALIBRATION_DIR}")
+        logger.info("Calibrating INT8 engine on %s frames", len(image_paths))
+        return YoloCalibrator(image_paths, cache_path)
+
+    def _warmup(self, iterations: int = 3):
+        """Run dummy batches so kernel selection/JIT happens before the first request"""
+        frames = [np.zeros((YOLO_IMG_SIZE, YOLO_IMG_SIZE, 3), dtype=np.uint8)] * MAX_BATCH
+        for _ in range(iterations):
+            for slot in range(self.pipeline_depth):
+                with self._stream(slot):
+                    self._forward(preprocess_batch(frames, self.staging[slot]), slot)
+                    if self.streams:
+                        self.streams[slot].synchronize()
+
+        if self.engine is None and self.device.type == 'cuda':
+            try:
+                self._capture_graph()
+                logger.info("Captured CUDA graph for YOLOv5 inference")
+            except Exception as e:
+                logger.warning("CUDA graph capture failed, using eager inference: %s", e)
+                self.graph = None
+
+    def _capture_graph(self):
+        """Record the fixed-shape max-batch forward pass so requests replay it without launch overhead"""
+        self.graph_input = torch.zeros((MAX_BATCH, 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE), dtype=torch.float16, device='cuda')
+        side_stream = torch.cuda.Stream()
+        side_stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(side_stream), torch.no_grad():
+            for _ in range(3):
+                self.model(self.graph_input)
+        torch.cuda.current_stream().wait_stream(side_stream)
+
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph), torch.no_grad():
+            output = self.model(self.graph_input)
+        self.graph_output = output[0] if isinstance(output, (list, tuple)) else output
+        self.graph = graph
+
+    def _stream(self, slot: int):
+        """CUDA stream context for a pipeline slot (no-op on CPU)"""
+        return torch.cuda.stream(self.streams[slot] if self.streams else None)
+
+    def _forward(self, batch: torch.Tensor, slot: int = 0) -> torch.Tensor:
+        # Ship uint8 pixels (1 byte each) and normalize to fp16 on the GPU
+        batch = batch.to(self.device, non_blocking=True)
+        batch = (batch.half() if self.device.type == 'cuda' else batch.float()).div_(255.0)
+        if self.engine is not None:
+            return self.engine(batch, slot)
+        if self.graph is not None:
+            n = batch.shape[0]
+            self.graph_input[:n].copy_(batch)
+            self.graph.replay()
+            return self.graph_output[:n].clone()
+        with torch.no_grad():
+            output = self.model(batch)
+        return output[0] if isinstance(output, (list, tuple)) else output
+
+    def detect_batch(self, items: List[Tuple[np.ndarray, Tuple[int, int]]], slot: int = 0) -> List[Optional[Dict[str, Any]]]:
+        """Run one batched forward pass over decoded frames on a pipeline slot, best detection per frame"""
+        frames = [frame for frame, _ in items]
+        # Copy, inference and decode are all queued on the slot's stream; .tolist() waits for just that stream
+        with self._stream(slot):
+            pred = self._forward(preprocess_batch(frames, self.staging[slot]), slot).float()
+
+            # pred: (batch, anchors, 5 + classes) as cx, cy, w, h, objectness, class scores
+            scores = pred[..., 5:] * pred[..., 4:5]
+            num_classes = scores.shape[-1]
+            best_scores, best_idx = scores.flatten(1).max(dim=1)
+            anchors = best_idx // num_classes
+            class_ids = best_idx % num_classes
+            boxes = pred[torch.arange(pred.shape[0], device=pred.device), anchors, :4]
+            best_scores, class_ids, boxes = best_scores.tolist(), class_ids.tolist(), boxes.tolist()
+
+        detections = []
+        for (_, (h, w)), confidence, class_id, box in zip(items, best_scores, class_ids, boxes):
+            label = self.labels.get(class_id)
+            if confidence < self.conf_threshold or label is None:
+                detections.append(None)
+                continue
+
+            # Boxes are in letterboxed input space; remove the padding and scale back to the original frame
+            cx, cy, bw, bh = box
+            nh, nw, top, left = letterbox_geometry(h, w, YOLO_IMG_SIZE)
+            cx, cy = cx - left, cy - top
+            sx, sy = w / nw, h / nh
+            detections.append({
+                "gesture": label["name"],
+                "confidence": confidence,
+                "bbox": [
+                    max(0, int((cx - bw / 2) * sx)),
+                    max(0, int((cy - bh / 2) * sy)),
+                    min(w, int((cx + bw / 2) * sx)),
+                    min(h, int((cy + bh / 2) * sy))
+                ],
+                "urdu_text": label["urdu"],
+                "pashto_text": label["pashto"],
+                "meaning": label["english"],
+                "landmarks_detected": False,
+                "detection_method": "YOLOv5"
+            })
+        return detections
+
+class GestureBatcher:
+    """Coalesces concurrent detection requests into a single YOLOv5 batch"""
+
+    def __init__(self, detector: YoloGestureDetector, executor: Executor, max_batch: int = MAX_BATCH,
+                 timeout: float = BATCH_TIMEOUT):
+        self.detector = detector
+        self.executor = executor
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.queue: Optional[asyncio.Queue] = None
+        self.slots: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.in_flight = set()
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        # Free pipeline slots; up to pipeline_depth batches run concurrently on separate streams
+        self.slots = asyncio.Queue()
+        for slot in range(self.detector.pipeline_depth):
+            self.slots.put_nowait(slot)
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.worker:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+        if self.in_flight:
+            await asyncio.gather(*self.in_flight, return_exceptions=True)
+
+    async def submit(self, item: Tuple[np.ndarray, Tuple[int, int]]) -> Optional[Dict[str, Any]]:
+        """Queue a decoded frame and wait for its slice of the batch result"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def _collect_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.timeout
+
+        while len(batch) < self.max_batch:
+            # Take frames that are already waiting without arming a wait_for timer for each
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # Frames keep queueing while every slot is busy, so the next batch fills up meanwhile
+            slot = await self.slots.get()
+            batch = await self._collect_batch()
+            task = asyncio.create_task(self._infer(batch, slot))
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+
+    async def _infer(self, batch, slot: int):
+        loop = asyncio.get_running_loop()
+        items = [item for item, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.executor, self.detector.detect_batch, items, slot)
+        except Exception as e:
+            logger.error("Batched YOLOv5 inference failed: %s", e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.slots.put_nowait(slot)
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -7,6 +7,19 @@ import './App.css';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// FastAPI errors carry `detail` as a string, but validation errors (422) send a list of
+// { loc, msg } objects, so turn either shape into text before it reaches the error banner
+const errorDetail = (error, fallback) => {
+  const detail = error.response?.data?.detail;
+  if (Array.isArray(detail)) {
+    return detail.map((item) => item?.msg || String(item)).join('; ') || fallback;
+  }
+  if (detail && typeof detail === 'object') {
+    return detail.message || fallback;
+  }
+  return detail || fallback;
+};
+
 const App = () => {
   const [mode, setMode] = useState('sign-to-speech'); // 'sign-to-speech', 'speech-to-sign', 'text-to-sign', or 'story'
   const [language, setLanguage] = useState('urdu');
@@ -110,7 +123,7 @@ const App = () => {
         }
       }
     } catch (error) {
-      setError(error.response?.data?.detail || 'Gesture detection failed');
+      setError(errorDetail(error, 'Gesture detection failed'));
       console.error('Gesture detection error:', error);
     } finally {
       setIsProcessing(false);
@@ -343,7 +356,7 @@ const App = () => {
         setError('Text to sign conversion failed - invalid response');
       }
     } catch (error) {
-      setError(error.response?.data?.detail || error.response?.data?.error || 'Text to sign conversion failed');
+      setError(errorDetail(error, error.response?.data?.error || 'Text to sign conversion failed'));
     } finally {
       setIsProcessing(false);
     }
@@ -110,7 +110,6 @@ class SignToSpeech:
         try:
             # Use simple hand detection simulation based on frame analysis
             # This is a mock implementation that cycles through gestures for demonstration
-            import time
             current_time = int(time.time()) % len(self.labels)
             
             # Get a gesture from our database